@@ -15,15 +15,32 @@ Key concepts:
     All logging goes to stderr instead.
 """
 
+import asyncio
+import codecs
+import io
 import logging
+import os
 import re
 import sys
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from urllib.parse import urljoin, urlparse
 
-from bs4 import BeautifulSoup
-from markdownify import markdownify as md
+import httpx
 from mcp.server.fastmcp import FastMCP
-from playwright.async_api import async_playwright
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+    Request,
+    Route,
+    async_playwright,
+)
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from selectolax.lexbor import LexborHTMLParser, LexborNode
 
 # ---------------------------------------------------------------------------
 # Logging — must go to stderr so we don't interfere with the stdio JSON-RPC
@@ -36,104 +53,690 @@ logging.basicConfig(
 )
 logger = logging.getLogger("web-scraper")
 
+# ---------------------------------------------------------------------------
+# Shared browser — launching Chromium takes far longer than rendering most
+# pages, so we start it once on first use and keep it for the lifetime of
+# the server.
+#
+# Renders run concurrently in a bounded pool of browser contexts (set the
+# size with SCRAPER_MAX_CONTEXTS). A context is put back in the pool after
+# use and retired after _CONTEXT_MAX_USES renders so cookies and cache
+# don't pile up.
+# ---------------------------------------------------------------------------
+_pw: Playwright | None = None
+_browser: Browser | None = None
+_browser_lock = asyncio.Lock()
+
+
+def _max_contexts_from_env(default: int = 4) -> int:
+    """Read SCRAPER_MAX_CONTEXTS, falling back to `default` if it's unset,
+    not an integer, or below 1 (a zero-slot pool would block forever)."""
+    raw = os.environ.get("SCRAPER_MAX_CONTEXTS", "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value < 1:
+        logger.warning(
+            f"Ignoring SCRAPER_MAX_CONTEXTS={raw!r}: expected an integer >= 1; "
+            f"using {default}"
+        )
+        return default
+    return value
+
+
+_MAX_CONTEXTS = _max_contexts_from_env()
+_CONTEXT_MAX_USES = 20
+_context_slots = asyncio.Semaphore(_MAX_CONTEXTS)
+_idle_contexts: asyncio.Queue[tuple[BrowserContext, int]] = asyncio.Queue()
+
+# Options for every browser context. Override the user agent with
+# SCRAPER_USER_AGENT if a site treats the default one differently.
+_UA = os.environ.get(
+    "SCRAPER_USER_AGENT",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36",
+)
+_CONTEXT_OPTS = {
+    "user_agent": _UA,
+    "viewport": {"width": 1280, "height": 800},
+    "java_script_enabled": True,
+}
+
+
+async def _get_browser() -> Browser:
+    """Return the shared Chromium instance, launching it on first use."""
+    global _pw, _browser
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            if _pw is None:
+                _pw = await async_playwright().start()
+            logger.info("Launching headless Chromium")
+            _browser = await _pw.chromium.launch(headless=True)
+        return _browser
+
+
+async def _close_browser() -> None:
+    """Shut down the shared browser and Playwright driver, if running."""
+    global _pw, _browser
+    async with _browser_lock:
+        # Pooled contexts die with the browser; just forget them.
+        while not _idle_contexts.empty():
+            _idle_contexts.get_nowait()
+        if _browser is not None:
+            await _browser.close()
+            _browser = None
+        if _pw is not None:
+            await _pw.stop()
+            _pw = None
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP client — most pages are plain HTML that doesn't need a browser
+# at all. Those are fetched directly, reusing one connection pool.
+# ---------------------------------------------------------------------------
+_http_client: httpx.AsyncClient | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            headers={"User-Agent": _UA},
+            timeout=10,
+        )
+    return _http_client
+
+
+async def _close_http_client() -> None:
+    """Close the shared HTTP client, if it was ever used."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Close the shared browser and HTTP client when the server shuts down."""
+    try:
+        yield
+    finally:
+        await _close_browser()
+        await _close_http_client()
+
+
 # ---------------------------------------------------------------------------
 # Create the MCP server instance.
 # FastMCP inspects each @mcp.tool() function and auto-generates the tool's
 # JSON Schema from its name, type hints, and docstring.
 # ---------------------------------------------------------------------------
-mcp = FastMCP(name="web-scraper")
+mcp = FastMCP(name="web-scraper", lifespan=lifespan)
+
+# Compiled once at import time so scrape_url doesn't pay for the re module's
+# pattern-cache lookup on every call.
+_EXCESS_NL = re.compile(r"\n{3,}")
+
+# URL prefixes the link-returning tools accept (skips mailto:, javascript:...).
+_HTTP_SCHEMES = ("http://", "https://")
+
+# ---------------------------------------------------------------------------
+# Page cache — the model often calls several tools on the same URL back to
+# back. Recently parsed pages are kept for a short while so those follow-up
+# calls skip both the fetch and the parser. Keyed by
+# (url, wait_time, force_browser) and holding (expires_at, tree).
+#
+# Cached trees are shared between tool calls, so tools must only read them —
+# never decompose() or strip_tags() a tree returned by get_page().
+# ---------------------------------------------------------------------------
+_PAGE_CACHE_SIZE = 16
+_PAGE_CACHE_TTL = 60  # seconds
+_page_cache: OrderedDict[tuple[str, int, bool], tuple[float, LexborHTMLParser]] = (
+    OrderedDict()
+)
+
+# A directly fetched page with less visible text than this, alongside
+# external scripts or this much inline script, is assumed to be a JS app
+# shell and is rendered in the browser instead.
+_STATIC_MIN_TEXT = 500
+_STATIC_MAX_INLINE_SCRIPT = 5000
+# Bodies larger than this aren't worth reading over HTTP; the browser gets
+# the URL instead.
+_STATIC_MAX_BYTES = 5 * 1024 * 1024
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...;
+# charset=...">, looked for near the top of a page whose Content-Type
+# header names no charset — as browsers do.
+_META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+_META_CHARSET_WINDOW = 1024  # bytes
+
+# Outermost elements whose text is never shown on the page.
+_INVISIBLE_SELECTOR = (
+    ":is(script, style, noscript, template):not(:is(noscript, template) *)"
+)
+# <script> types the browser executes. Data blocks such as JSON-LD don't
+# make a page need JS.
+_JS_SCRIPT_TYPES = frozenset({
+    "", "module", "text/javascript", "application/javascript",
+    "text/ecmascript", "application/ecmascript",
+})
+
+# Resource types the tools never read. Aborting them saves the download and
+# decode time in Chromium and shrinks the rendered HTML we parse.
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+# How long after scrolling to watch for lazy-load requests before deciding
+# the page has nothing more to fetch, and how long to let the requests that
+# did start finish.
+_LAZY_LOAD_GRACE = 0.3  # seconds
+_LAZY_LOAD_TIMEOUT = 2.0  # seconds
 
 
 # ---------------------------------------------------------------------------
-# Helper: launch a headless browser, navigate to a URL, return parsed HTML
+# Helper: fetch a page (directly or in the shared browser), return parsed HTML
 
-async def get_page(url: str, wait_time: int = 5) -> BeautifulSoup:
+async def get_page(
+    url: str, wait_time: int = 5, force_browser: bool = False
+) -> LexborHTMLParser:
     """
-    Launch headless Chromium, navigate to `url`, wait for JS to render,
-    and return a BeautifulSoup object of the fully-rendered page.
+    Return a selectolax (Lexbor) tree of the fully-rendered page at `url`.
 
-    Why async?  Both Playwright and MCP use async/await natively, so they
-    compose together without any thread hacks.
+    Pages parsed within the last `_PAGE_CACHE_TTL` seconds are served from
+    the cache. Otherwise the page is first fetched with a plain HTTP GET;
+    only if that fails or the page looks like it needs JavaScript is it
+    rendered in the shared browser. The returned tree may be shared with
+    other tool calls, so treat it as read-only.
+
+    Lexbor parses and runs CSS selectors in C, so the tools below never
+    build a Python object per tag the way BeautifulSoup does.
 
     Args:
         url: The page to fetch.
-        wait_time: Extra seconds to wait after network is idle (for slow JS).
+        wait_time: Max seconds to wait for the network to go idle (for slow JS).
+        force_browser: Always render in the browser, skipping the direct fetch.
+    """
+    key = (url, wait_time, force_browser)
+    cached = _page_cache.get(key)
+    if cached and time.monotonic() < cached[0]:
+        logger.info(f"Cache hit: {url}")
+        _page_cache.move_to_end(key)
+        return cached[1]
+
+    tree = None if force_browser else await _fetch_static(url)
+    if tree is None:
+        tree = LexborHTMLParser(await _render_page(url, wait_time))
+    _page_cache[key] = (time.monotonic() + _PAGE_CACHE_TTL, tree)
+    _page_cache.move_to_end(key)
+    while len(_page_cache) > _PAGE_CACHE_SIZE:
+        _page_cache.popitem(last=False)
+    return tree
+
+
+async def _fetch_static(url: str) -> LexborHTMLParser | None:
+    """
+    Fetch `url` with a plain HTTP GET and parse it.
+
+    Returns None — meaning "use the browser" — if the request fails, the
+    response isn't HTML or is too large, or the page looks like it needs
+    JavaScript. The headers are checked before any of the body is read.
     """
-    logger.info(f"Fetching: {url}")
-    browser = None
-    pw = None
     try:
-        # async_playwright() gives us a Playwright instance we can use
-        # to launch browsers.
-        pw = await async_playwright().start()
-        browser = await pw.chromium.launch(headless=True)
-
-        # A "browser context" is like an incognito window — isolated cookies,
-        # cache, etc.  Good practice even if we only open one page.
-        context = await browser.new_context(
-            user_agent=(
-                "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            )
-        )
-        page = await context.new_page()
+        async with _get_http_client().stream("GET", url) as response:
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "")
+            if "html" not in content_type:
+                logger.info(f"Direct fetch of {url} returned {content_type!r}; using the browser")
+                return None
+
+            # Content-Length counts the compressed body, so it's a lower
+            # bound on what we'd have to read.
+            length = response.headers.get("content-length", "")
+            if length.isdigit() and int(length) > _STATIC_MAX_BYTES:
+                logger.info(f"{url} is over {_STATIC_MAX_BYTES} bytes; using the browser")
+                return None
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > _STATIC_MAX_BYTES:
+                    logger.info(f"{url} is over {_STATIC_MAX_BYTES} bytes; using the browser")
+                    return None
+            charset = response.charset_encoding
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        logger.info(f"Direct fetch of {url} failed ({type(e).__name__}); using the browser")
+        return None
+
+    tree = LexborHTMLParser(_decode_html(bytes(body), charset))
+    if _needs_js(tree):
+        logger.info(f"{url} looks like a JS app; using the browser")
+        return None
+
+    logger.info(f"Got {len(body)} bytes from {url} without a browser")
+    return tree
+
+
+def _decode_html(body: bytes, charset: str | None) -> str:
+    """
+    Decode an HTML body. `charset` comes from the Content-Type header; when
+    it's missing, use the page's <meta> charset, then UTF-8.
+    """
+    if body.startswith(codecs.BOM_UTF8):
+        return body[len(codecs.BOM_UTF8):].decode("utf-8", errors="replace")
+    if not charset:
+        match = _META_CHARSET.search(body[:_META_CHARSET_WINDOW])
+        charset = match.group(1).decode("ascii") if match else None
+    try:
+        return body.decode(charset or "utf-8", errors="replace")
+    except LookupError:  # unknown charset name
+        return body.decode("utf-8", errors="replace")
+
+
+def _needs_js(tree: LexborHTMLParser) -> bool:
+    """Guess whether a directly fetched page only renders its content with JS."""
+    invisible_len = sum(len(n.text(strip=True)) for n in tree.css(_INVISIBLE_SELECTOR))
+    text_len = len(tree.root.text(strip=True)) - invisible_len
+    if text_len >= _STATIC_MIN_TEXT:
+        return False
+
+    scripts = [
+        s for s in tree.css("script")
+        if (s.attributes.get("type") or "").split(";")[0].strip().lower()
+        in _JS_SCRIPT_TYPES
+    ]
+    inline_len = sum(len(s.text(strip=True)) for s in scripts)
+    return inline_len > _STATIC_MAX_INLINE_SCRIPT or any(
+        s.attributes.get("src") for s in scripts
+    )
 
-        # Use "domcontentloaded" first (fast, works on all sites), then
-        # wait for the page to settle. Heavy SPAs like Amazon never reach
-        # "networkidle" because of analytics/ads firing continuously.
-        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
 
-        # Wait for JS frameworks to render content. SPAs (React, Angular)
-        # need time after the initial HTML loads to fetch data and paint.
-        await page.wait_for_timeout(wait_time * 1000)
+async def _block_heavy_resources(route: Route) -> None:
+    """Playwright route handler: abort images, media, fonts and CSS."""
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _wait_for_idle(page: Page, timeout_ms: int) -> None:
+    """Wait until the network goes quiet, giving up after `timeout_ms`.
+
+    Pages with constant background traffic never go idle, so a timeout
+    just means "carry on with what has rendered so far". A `timeout_ms` of
+    0 or less skips the wait — Playwright would read 0 as "no timeout" and
+    hang on exactly those pages.
+    """
+    if timeout_ms <= 0:
+        return
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        pass
+
+
+async def _new_context() -> BrowserContext:
+    """Create a browser context in the shared browser, ready for scraping."""
+    browser = await _get_browser()
+
+    # A "browser context" is like an incognito window — isolated cookies,
+    # cache, etc. — kept apart from the other contexts in the pool.
+    context = await browser.new_context(**_CONTEXT_OPTS)
+    await context.route("**/*", _block_heavy_resources)
+    return context
+
+
+@asynccontextmanager
+async def _pooled_context() -> AsyncIterator[BrowserContext]:
+    """Borrow a browser context from the pool, waiting if all are busy."""
+    async with _context_slots:
+        context, uses = None, 0
+        while context is None and not _idle_contexts.empty():
+            context, uses = _idle_contexts.get_nowait()
+            if not (context.browser and context.browser.is_connected()):
+                context = None
+        if context is None:
+            context, uses = await _new_context(), 0
+
+        reusable = False
+        try:
+            yield context
+            reusable = True
+        finally:
+            uses += 1
+            if reusable and uses < _CONTEXT_MAX_USES:
+                _idle_contexts.put_nowait((context, uses))
+            else:
+                await context.close()
 
-        # Scroll down to trigger lazy-loaded content, then wait again.
-        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        await page.wait_for_timeout(2000)
 
-        # page.content() returns the *rendered* HTML — after JS has run.
-        html = await page.content()
-        logger.info(f"Got {len(html)} bytes from {url}")
-        return BeautifulSoup(html, "html.parser")
+async def _scroll_and_settle(page: Page) -> None:
+    """Scroll to the bottom of `page` and wait for any lazy loading to finish.
+
+    Requests are tracked from the moment of the scroll. If none starts
+    within `_LAZY_LOAD_GRACE` seconds we return straight away; otherwise we
+    wait until every one of them has finished or failed, for at most
+    `_LAZY_LOAD_TIMEOUT` seconds.
+    """
+    in_flight: set[Request] = set()
+    started = asyncio.Event()
+    drained = asyncio.Event()
+
+    def on_request(request: Request) -> None:
+        in_flight.add(request)
+        started.set()
+
+    def on_done(request: Request) -> None:
+        in_flight.discard(request)
+        if not in_flight:
+            drained.set()
+
+    async def wait_until_drained() -> None:
+        while in_flight:
+            drained.clear()
+            await drained.wait()
+
+    page.on("request", on_request)
+    page.on("requestfinished", on_done)
+    page.on("requestfailed", on_done)
+    try:
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        try:
+            await asyncio.wait_for(started.wait(), _LAZY_LOAD_GRACE)
+            await asyncio.wait_for(wait_until_drained(), _LAZY_LOAD_TIMEOUT)
+        except TimeoutError:
+            pass
     finally:
-        if browser:
-            await browser.close()
-        if pw:
-            await pw.stop()
+        page.remove_listener("request", on_request)
+        page.remove_listener("requestfinished", on_done)
+        page.remove_listener("requestfailed", on_done)
+
+
+async def _render_page(url: str, wait_time: int) -> str:
+    """
+    Open `url` in a pooled context of the shared headless Chromium, wait
+    for JS to render, and return the rendered HTML.
+
+    Why async?  Both Playwright and MCP use async/await natively, so they
+    compose together without any thread hacks.
+    """
+    logger.info(f"Fetching: {url}")
+    async with _pooled_context() as context:
+        page = await context.new_page()
+        try:
+            return await _load_page(page, url, wait_time)
+        finally:
+            await page.close()
+
+
+async def _load_page(page: Page, url: str, wait_time: int) -> str:
+    """Navigate `page` to `url`, let it settle, and return its HTML."""
+    # Use "domcontentloaded" first (fast, works on all sites), then
+    # wait for the page to settle. Heavy SPAs like Amazon never reach
+    # "networkidle" because of analytics/ads firing continuously.
+    await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+
+    # Wait for JS frameworks to render content. SPAs (React, Angular)
+    # need time after the initial HTML loads to fetch data and paint.
+    # Fast pages go idle well before `wait_time`; busy ones hit the cap.
+    await _wait_for_idle(page, wait_time * 1000)
+
+    # Scroll down to trigger lazy-loaded content, then wait for whatever
+    # the scroll started fetching. (A second networkidle wait would return
+    # at once here — the page already reached that state above.)
+    await _scroll_and_settle(page)
+
+    # page.content() returns the *rendered* HTML — after JS has run.
+    html = await page.content()
+    logger.info(f"Got {len(html)} bytes from {url}")
+    return html
+
+
+# Wrappers too small to give useful context on their own in search_text.
+_INLINE_TAGS = frozenset({"span", "b", "i", "em", "strong", "small", "mark"})
+
+
+def _ascend(node: LexborNode) -> tuple[LexborNode, LexborNode | None]:
+    """Walk up from `node` once, returning its context block and its link.
+
+    The context block is the first element that isn't one of _INLINE_TAGS,
+    looking at most 5 levels up. The link is `node` or its closest ancestor
+    that is an <a> with an href, if any.
+    """
+    context_el = None
+    link = None
+    last = node
+    depth = 0
+    while node is not None and node.is_element_node:
+        if context_el is None and (node.tag not in _INLINE_TAGS or depth == 5):
+            context_el = node
+        if link is None and node.tag == "a" and node.attributes.get("href"):
+            link = node
+        if context_el is not None and link is not None:
+            break
+        last = node
+        node = node.parent
+        depth += 1
+    return context_el or last, link
+
+
+# ---------------------------------------------------------------------------
+# Markdown conversion — a single walk over the Lexbor tree. Covers the
+# elements that matter for reading a page (headings, paragraphs, lists,
+# links, emphasis, code, quotes, tables); anything else contributes its
+# text. This avoids serializing the tree back to HTML and re-parsing it.
+# ---------------------------------------------------------------------------
+_WHITESPACE = re.compile(r"\s+")
+
+# Page chrome that isn't part of the main content.
+_CHROME_TAGS = ("nav", "header", "footer", "aside")
+_CHROME_SCOPE = ", ".join(f"{tag} *" for tag in _CHROME_TAGS)
+
+_MD_SKIP_TAGS = frozenset({
+    "script", "style", "noscript", "template", "img", "svg", *_CHROME_TAGS,
+})
+_MD_BLOCK_TAGS = frozenset({
+    "p", "div", "section", "article", "main", "form", "fieldset", "figure",
+    "figcaption", "address", "details", "summary", "dl", "dt", "dd", "body",
+})
+_MD_EMPHASIS = {"strong": "**", "b": "**", "em": "*", "i": "*"}
+_BACKTICKS = re.compile(r"`+")
+
+
+def to_markdown(node: LexborNode) -> str:
+    """Convert `node` and everything under it to Markdown."""
+    return _md_children(node)
+
+
+def _md_children(node: LexborNode, at_line_start: bool = True) -> str:
+    """Markdown for `node`'s children. `at_line_start` says whether the
+    output lands at the start of a line (true for blocks; inline elements
+    pass down their caller's state)."""
+    parts: list[str] = []
+    child = node.child
+    while child is not None:
+        piece = _md_node(child, at_line_start)
+        if piece:
+            # Collapsed whitespace next to a block boundary is noise.
+            if at_line_start:
+                piece = piece.lstrip(" ")
+            elif piece.startswith("\n") and parts:
+                parts[-1] = parts[-1].rstrip(" ")
+            if piece:
+                parts.append(piece)
+                at_line_start = piece.endswith("\n")
+        child = child.next
+    return "".join(parts)
+
+
+def _md_node(node: LexborNode, at_line_start: bool) -> str:
+    if node.is_text_node:
+        return _WHITESPACE.sub(" ", node.text_content or "")
+    if not node.is_element_node:
+        return ""
+
+    tag = node.tag
+    if tag in _MD_SKIP_TAGS:
+        return ""
+    if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+        text = _md_inline(node)
+        return f"\n\n{'#' * int(tag[1])} {text}\n\n" if text else ""
+    if tag in _MD_BLOCK_TAGS:
+        return f"\n\n{_md_children(node).strip()}\n\n"
+    if tag == "a":
+        text = _WHITESPACE.sub(" ", _md_children(node, at_line_start))
+        href = node.attributes.get("href")
+        return _md_wrap(text, "[", f"]({href})") if href else text
+    if tag in _MD_EMPHASIS:
+        return _md_wrap(_md_children(node, at_line_start), _MD_EMPHASIS[tag])
+    if tag == "code":
+        return _md_code(_md_children(node, at_line_start))
+    if tag == "pre":
+        return f"\n\n```\n{(node.text() or '').strip(chr(10))}\n```\n\n"
+    if tag == "blockquote":
+        lines = _EXCESS_NL.sub("\n\n", _md_children(node).strip()).split("\n")
+        return "\n\n" + "\n".join(f"> {line}".rstrip() for line in lines) + "\n\n"
+    if tag in ("ul", "ol"):
+        return _md_list(node, ordered=tag == "ol")
+    if tag == "table":
+        return _md_table(node)
+    if tag == "br":
+        return "  \n"
+    if tag == "hr":
+        return "\n\n---\n\n"
+    return _md_children(node, at_line_start)
+
+
+def _md_inline(node: LexborNode) -> str:
+    """Markdown for `node`'s children, flattened onto a single line."""
+    return _WHITESPACE.sub(" ", _md_children(node)).strip()
+
+
+def _md_wrap(text: str, marker: str, end: str | None = None) -> str:
+    """Wrap `text` in `marker` (and `end`, if different), keeping
+    surrounding spaces outside it."""
+    core = text.strip()
+    if not core:
+        return text
+    lead = " " if text[0].isspace() else ""
+    trail = " " if text[-1].isspace() else ""
+    return f"{lead}{marker}{core}{end or marker}{trail}"
+
+
+def _md_code(text: str) -> str:
+    """Inline code span for `text`. The fence is one backtick longer than
+    any run inside it, padded with spaces so the text can start or end with
+    a backtick."""
+    runs = _BACKTICKS.findall(text)
+    fence = "`" * (max(map(len, runs), default=0) + 1)
+    pad = " " if runs else ""
+    return _md_wrap(text, fence + pad, pad + fence)
+
+
+def _md_list(node: LexborNode, ordered: bool) -> str:
+    try:
+        start = int(node.attributes.get("start") or 1) if ordered else 1
+    except ValueError:
+        start = 1
+    items = []
+    child = node.child
+    while child is not None:
+        if child.tag == "li":
+            bullet = f"{start + len(items)}. " if ordered else "* "
+            indent = " " * len(bullet)
+            # Blocks inside the item stay separated by one blank line.
+            body = _EXCESS_NL.sub("\n\n", _md_children(child).strip())
+            lines = [
+                f"{indent}{line.rstrip()}" if line.strip() else ""
+                for line in body.split("\n")
+            ]
+            items.append(bullet + "\n".join(lines)[len(indent):])
+        child = child.next
+    if not items:
+        return ""
+    # A list nested in an item follows the item's text directly.
+    edge = "\n" if node.parent is not None and node.parent.tag == "li" else "\n\n"
+    return edge + "\n".join(items) + edge
+
+
+def _md_table_rows(node: LexborNode) -> list[LexborNode]:
+    """The table's own rows, in order — not those of tables nested in it."""
+    rows = []
+    child = node.child
+    while child is not None:
+        if child.tag == "tr":
+            rows.append(child)
+        elif child.tag in ("thead", "tbody", "tfoot"):
+            rows.extend(_md_table_rows(child))
+        child = child.next
+    return rows
+
+
+def _md_table(node: LexborNode) -> str:
+    rows = []
+    for tr in _md_table_rows(node):
+        cells = []
+        cell = tr.child
+        while cell is not None:
+            if cell.tag in ("th", "td"):
+                cells.append(_md_inline(cell).replace("|", "\\|"))
+            cell = cell.next
+        if cells:
+            rows.append(cells)
+    if not rows:
+        return ""
+
+    width = max(len(row) for row in rows)
+    lines = []
+    for i, row in enumerate(rows):
+        row += [""] * (width - len(row))
+        lines.append("| " + " | ".join(row) + " |")
+        if i == 0:
+            lines.append("|" + " --- |" * width)
+    return "\n\n" + "\n".join(lines) + "\n\n"
 
 
 # ---------------------------------------------------------------------------
 # Tool 1: scrape_url — fetch a page and return clean Markdown content
 # ---------------------------------------------------------------------------
 @mcp.tool()
-async def scrape_url(url: str, wait_time: int = 5) -> str:
+async def scrape_url(url: str, wait_time: int = 5, force_browser: bool = False) -> str:
     """Scrape a webpage and return its main content as clean Markdown.
 
-    Launches a headless browser to fully render the page (including JS),
+    Fetches the page (rendering it in a headless browser when it needs JS),
     strips navigation/ads/scripts, and converts the main content to Markdown.
 
     Args:
         url: The full URL to scrape (e.g. "https://example.com").
-        wait_time: Seconds to wait for JS rendering after network is idle.
+        wait_time: Max seconds to wait for JS rendering to finish.
                    Increase for slow single-page apps. Default: 3.
+        force_browser: If True, always render with the headless browser, even
+                       if the page looks like static HTML.
     """
-    soup = await get_page(url, wait_time)
-
-    # Remove noisy elements that aren't part of the main content.
-    for tag in soup.find_all(["script", "style", "nav", "footer", "header", "aside"]):
-        tag.decompose()
-
-    # Try to find the main content area. Fall back to <body> if needed.
-    content = soup.find("main") or soup.find("article") or soup.find("body")
+    tree = await get_page(url, wait_time, force_browser)
+
+    # Try to find the main content area, ignoring anything inside the page
+    # chrome (nav, header, ...). Fall back to <body> if needed. Noisy
+    # elements are skipped by to_markdown() rather than removed, since the
+    # tree is shared through the page cache.
+    content = (
+        tree.css_first(f"main:not({_CHROME_SCOPE})")
+        or tree.css_first(f"article:not({_CHROME_SCOPE})")
+        or tree.body
+    )
     if not content:
         return "Error: Could not find any content on the page."
 
     # Convert HTML → Markdown for a clean, readable output.
-    markdown = md(str(content), heading_style="ATX", strip=["img"])
+    markdown = to_markdown(content)
 
     # Clean up excessive whitespace.
-    markdown = re.sub(r"\n{3,}", "\n\n", markdown)
+    markdown = _EXCESS_NL.sub("\n\n", markdown)
     markdown = markdown.strip()
 
     if not markdown:
@@ -146,7 +749,9 @@ async def scrape_url(url: str, wait_time: int = 5) -> str:
 # Tool 2: extract_links — get all links from a page
 # ---------------------------------------------------------------------------
 @mcp.tool()
-async def extract_links(url: str, same_domain_only: bool = False) -> str:
+async def extract_links(
+    url: str, same_domain_only: bool = False, force_browser: bool = False
+) -> str:
     """Extract all links from a webpage.
 
     Returns a deduplicated Markdown list of links found on the page.
@@ -155,47 +760,62 @@ async def extract_links(url: str, same_domain_only: bool = False) -> str:
         url: The full URL to scrape.
         same_domain_only: If True, only return links that point to the same
                           domain as the input URL. Useful for site mapping.
+        force_browser: If True, always render with the headless browser, even
+                       if the page looks like static HTML.
     """
-    soup = await get_page(url)
+    tree = await get_page(url, force_browser=force_browser)
     base_domain = urlparse(url).netloc
+
+    # A link is on the same domain when it is "http(s)://<domain>" followed by
+    # a path, query, fragment or nothing. Checking that with str.startswith
+    # avoids running urlparse on every link.
+    domain_roots = (f"http://{base_domain}", f"https://{base_domain}")
+    domain_prefixes = tuple(root + sep for root in domain_roots for sep in "/?#")
     seen = set()
-    links = []
+    # Lines go straight into one growing buffer rather than a list of
+    # strings that is joined (and so copied) at the end.
+    links = io.StringIO()
+    _urljoin = urljoin  # local alias: skips a global lookup per link
 
-    for a_tag in soup.find_all("a", href=True):
-        href = a_tag["href"]
+    for a_tag in tree.css("a[href]"):
+        href = a_tag.attributes.get("href") or ""
 
         # Resolve relative URLs (e.g. "/about" → "https://example.com/about").
-        full_url = urljoin(url, href)
+        full_url = _urljoin(url, href)
 
         # Skip non-HTTP links (mailto:, javascript:, tel:, etc.).
-        if not full_url.startswith(("http://", "https://")):
+        if not full_url.startswith(_HTTP_SCHEMES):
             continue
 
         # Optional: only keep links on the same domain.
-        if same_domain_only and urlparse(full_url).netloc != base_domain:
+        if same_domain_only and not (
+            full_url.startswith(domain_prefixes) or full_url in domain_roots
+        ):
             continue
 
         # Deduplicate.
         if full_url in seen:
             continue
+        if seen:
+            links.write("\n")
         seen.add(full_url)
 
         # Use the link text if available, otherwise use the URL itself.
-        text = a_tag.get_text(strip=True) or full_url
-        links.append(f"- [{text}]({full_url})")
+        text = a_tag.text(strip=True) or full_url
+        links.write(f"- [{text}]({full_url})")
 
-    if not links:
+    if not seen:
         return "No links found on this page."
 
-    header = f"Found {len(links)} links on {url}:\n\n"
-    return header + "\n".join(links)
+    header = f"Found {len(seen)} links on {url}:\n\n"
+    return header + links.getvalue()
 
 
 # ---------------------------------------------------------------------------
 # Tool 3: search_text — find a word/phrase on a page and return matching links
 # ---------------------------------------------------------------------------
 @mcp.tool()
-async def search_text(url: str, query: str) -> str:
+async def search_text(url: str, query: str, force_browser: bool = False) -> str:
     """Search for a word or phrase on a webpage.
 
     Finds all occurrences of the search term in the page text. For each match,
@@ -205,42 +825,54 @@ async def search_text(url: str, query: str) -> str:
     Args:
         url: The full URL to search.
         query: The word or phrase to search for (case-insensitive).
+        force_browser: If True, always render with the headless browser, even
+                       if the page looks like static HTML.
     """
-    soup = await get_page(url)
+    tree = await get_page(url, force_browser=force_browser)
 
-    # Remove non-content tags.
-    for tag in soup.find_all(["script", "style", "noscript"]):
-        tag.decompose()
+    # Fast path: one casefolded copy of the whole page text, searched with
+    # str.__contains__, rules out pages without the query before any per-node
+    # work. (It can't prove a match — text may span nodes or be hidden.)
+    if query.casefold() not in tree.root.text().casefold():
+        return f'Not found: "{query}" does not appear on {url}'
 
-    query_lower = query.lower()
+    # Text inside these tags isn't page content. The tree is shared through
+    # the page cache, so note those text nodes instead of removing the tags.
+    hidden = {
+        node.mem_id
+        for box in tree.css("script, style, noscript")
+        for node in box.traverse(include_text=True)
+        if node.is_text_node
+    }
+
+    # One case-insensitive pattern, scanned by the C regex engine, instead of
+    # lower-casing a copy of every text node.
+    query_pattern = re.compile(re.escape(query), re.IGNORECASE)
     results = []
     seen_urls = set()
 
-    # Search all text-containing elements for the query.
-    for element in soup.find_all(string=lambda text: text and query_lower in text.lower()):
+    # Search all text nodes for the query.
+    for element in tree.root.traverse(include_text=True, skip_empty=True):
+        if not element.is_text_node or not query_pattern.search(element.text_content):
+            continue
+        if element.mem_id in hidden:
+            continue
         parent = element.parent
         if not parent:
             continue
 
-        # Get the text of the containing block element for context.
-        # Walk up to find a meaningful parent (not just a <span> or <b>).
-        context_el = parent
-        for _ in range(5):
-            if context_el.parent and context_el.name in (
-                "span", "b", "i", "em", "strong", "small", "mark"
-            ):
-                context_el = context_el.parent
-            else:
-                break
-
-        context_text = context_el.get_text(strip=True)[:200]
+        # One walk up the tree finds both the containing block element (not
+        # just a <span> or <b>) for context and the link wrapping the match.
+        context_el, link_tag = _ascend(parent)
+        context_text = context_el.text(strip=True)[:200]
 
-        # Find the closest <a> link — either the parent itself or a nearby one.
-        link_tag = parent.find_parent("a", href=True) or context_el.find("a", href=True)
+        # No enclosing link — fall back to one inside the context block.
+        if link_tag is None:
+            link_tag = context_el.css_first("a[href]")
         link_url = None
-        if link_tag and link_tag.get("href"):
-            link_url = urljoin(url, link_tag["href"])
-            if not link_url.startswith(("http://", "https://")):
+        if link_tag and link_tag.attributes.get("href"):
+            link_url = urljoin(url, link_tag.attributes["href"])
+            if not link_url.startswith(_HTTP_SCHEMES):
                 link_url = None
 
         # Deduplicate by URL (or by context text if no URL).
@@ -265,7 +897,9 @@ async def search_text(url: str, query: str) -> str:
 # Tool 3: extract_elements — query elements by CSS selector
 # ---------------------------------------------------------------------------
 @mcp.tool()
-async def extract_elements(url: str, css_selector: str, limit: int = 20) -> str:
+async def extract_elements(
+    url: str, css_selector: str, limit: int = 20, force_browser: bool = False
+) -> str:
     """Extract specific elements from a webpage using a CSS selector.
 
     Useful for pulling structured data like headings, list items, table rows,
@@ -282,34 +916,39 @@ async def extract_elements(url: str, css_selector: str, limit: int = 20) -> str:
         url: The full URL to scrape.
         css_selector: A CSS selector to match elements.
         limit: Maximum number of elements to return (default 20).
+        force_browser: If True, always render with the headless browser, even
+                       if the page looks like static HTML.
     """
-    soup = await get_page(url)
-    elements = soup.select(css_selector)
+    tree = await get_page(url, force_browser=force_browser)
+    elements = tree.css(css_selector)
 
     if not elements:
         return f'No elements found matching "{css_selector}" on {url}.'
 
-    results = []
+    results = io.StringIO()
+    results.write(
+        f'Found {len(elements)} elements matching "{css_selector}" '
+        f"(showing {min(limit, len(elements))}):\n\n"
+    )
     for i, el in enumerate(elements[:limit]):
         # Gather useful attributes (id, class, href) for context.
+        el_attrs = el.attributes
         attrs = []
-        if el.get("id"):
-            attrs.append(f'id="{el["id"]}"')
-        if el.get("class"):
-            attrs.append(f'class="{" ".join(el["class"])}"')
-        if el.get("href"):
-            attrs.append(f'href="{el["href"]}"')
+        if el_attrs.get("id"):
+            attrs.append(f'id="{el_attrs["id"]}"')
+        if el_attrs.get("class"):
+            attrs.append(f'class="{" ".join(el_attrs["class"].split())}"')
+        if el_attrs.get("href"):
+            attrs.append(f'href="{el_attrs["href"]}"')
 
         attr_str = f" ({', '.join(attrs)})" if attrs else ""
-        text = el.get_text(strip=True)
+        text = el.text(strip=True)
 
-        results.append(f"{i + 1}. <{el.name}{attr_str}>: {text}")
+        if i:
+            results.write("\n")
+        results.write(f"{i + 1}. <{el.tag}{attr_str}>: {text}")
 
-    header = (
-        f'Found {len(elements)} elements matching "{css_selector}" '
-        f"(showing {min(limit, len(elements))}):\n\n"
-    )
-    return header + "\n".join(results)
+    return results.getvalue()
 
 
 # ---------------------------------------------------------------------------
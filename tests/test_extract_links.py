@@ -0,0 +1,58 @@
+"""Checks for extract_links' same-domain filter, run on a fixed page."""
+import asyncio
+
+import pytest
+from selectolax.lexbor import LexborHTMLParser
+
+import server
+
+PAGE_URL = "https://example.com/docs/"
+
+
+def same_domain_links(monkeypatch, href: str, page_url: str = PAGE_URL) -> str:
+    tree = LexborHTMLParser(f'<html><body><a href="{href}">link</a></body></html>')
+
+    async def fake_get_page(url, wait_time=5, force_browser=False):
+        return tree
+
+    monkeypatch.setattr(server, "get_page", fake_get_page)
+    return asyncio.run(server.extract_links(page_url, same_domain_only=True))
+
+
+@pytest.mark.parametrize(
+    ("href", "kept"),
+    [
+        ("/about", True),
+        ("guide.html", True),
+        ("https://example.com", True),
+        ("https://example.com/", True),
+        ("https://example.com?q=1", True),
+        ("https://example.com#top", True),
+        ("http://example.com/insecure", True),
+        ("https://example.com.evil.com/", False),
+        ("https://example.community/", False),
+        ("https://sub.example.com/", False),
+        ("https://example.com:8080/", False),
+        ("https://user@example.com/", False),
+        ("https://evil.com/?next=https://example.com/", False),
+        ("//example.com.evil.com/x", False),
+    ],
+)
+def test_same_domain_filter(monkeypatch, href, kept):
+    output = same_domain_links(monkeypatch, href)
+    assert ("Found 1 links" in output) is kept
+
+
+@pytest.mark.parametrize(
+    ("href", "kept"),
+    [
+        ("/about", True),
+        ("https://example.com:8080", True),
+        ("https://example.com:8080?q=1", True),
+        ("https://example.com/", False),
+        ("https://example.com:80800/", False),
+    ],
+)
+def test_same_domain_filter_respects_port(monkeypatch, href, kept):
+    output = same_domain_links(monkeypatch, href, "https://example.com:8080/")
+    assert ("Found 1 links" in output) is kept
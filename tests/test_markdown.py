@@ -0,0 +1,96 @@
+"""HTML → Markdown checks for server.to_markdown."""
+import pytest
+from selectolax.lexbor import LexborHTMLParser
+
+from server import _EXCESS_NL, to_markdown
+
+
+def md(html: str) -> str:
+    """Convert `html` the way scrape_url does."""
+    markdown = to_markdown(LexborHTMLParser(html).body)
+    return _EXCESS_NL.sub("\n\n", markdown).strip()
+
+
+@pytest.mark.parametrize(
+    ("html", "expected"),
+    [
+        ("<p>Price:<span> $5</span></p>", "Price: $5"),
+        ("<p>Hello<b> world</b></p>", "Hello **world**"),
+        ("<p>Hello <em>big </em>world</p>", "Hello *big* world"),
+        ('<p>See<a href="/x"> here</a> now</p>', "See [here](/x) now"),
+        ("<p>Run<code> ls </code>first</p>", "Run `ls` first"),
+        ("<p>  <span> leading</span> text</p>", "leading text"),
+    ],
+)
+def test_inline_spacing_is_kept(html, expected):
+    assert md(html) == expected
+
+
+@pytest.mark.parametrize(
+    ("html", "expected"),
+    [
+        ("<div>text <p>para</p></div>", "text\n\npara"),
+        ("<div>a <b>bold </b><p>para</p></div>", "a **bold**\n\npara"),
+        ("<div><span>a </span><ul><li>b</li></ul></div>", "a\n\n* b"),
+    ],
+)
+def test_trailing_space_before_a_block_is_dropped(html, expected):
+    assert md(html) == expected
+
+
+@pytest.mark.parametrize(
+    ("html", "expected"),
+    [
+        ("<p><code>ls -la</code></p>", "`ls -la`"),
+        ("<p><code>a`b</code></p>", "`` a`b ``"),
+        ("<p><code>``x`</code></p>", "``` ``x` ```"),
+    ],
+)
+def test_inline_code_fence_outlasts_backticks(html, expected):
+    assert md(html) == expected
+
+
+def test_headings_and_paragraphs():
+    assert md("<h2>Title</h2><p>One</p><p>Two</p>") == "## Title\n\nOne\n\nTwo"
+
+
+def test_lists():
+    html = "<ul><li>one <i>two</i></li><li>three</li></ul><ol><li>a</li><li>b</li></ol>"
+    assert md(html) == "* one *two*\n* three\n\n1. a\n2. b"
+
+
+def test_ordered_list_start():
+    assert md('<ol start="5"><li>x</li><li>y</li></ol>') == "5. x\n6. y"
+    assert md('<ol start="x"><li>x</li></ol>') == "1. x"
+
+
+def test_list_item_keeps_paragraph_breaks():
+    html = "<ul><li><p>a</p><p>b</p></li><li>c</li></ul>"
+    assert md(html) == "* a\n\n  b\n* c"
+
+
+def test_nested_list_follows_item_text():
+    html = "<ul><li>a<ol><li>sub</li></ol></li><li>c</li></ul>"
+    assert md(html) == "* a\n  1. sub\n* c"
+
+
+def test_table_sections():
+    html = (
+        "<table><thead><tr><th>H</th></tr></thead>"
+        "<tbody><tr><td>x</td></tr></tbody>"
+        "<tfoot><tr><td>f</td></tr></tfoot></table>"
+    )
+    assert md(html) == "| H |\n| --- |\n| x |\n| f |"
+
+
+def test_nested_table_rows_are_not_repeated():
+    html = (
+        "<table><tr><th>A</th><th>B</th></tr>"
+        "<tr><td>1</td><td><table><tr><td>inner</td></tr></table></td></tr>"
+        "</table>"
+    )
+    lines = md(html).split("\n")
+    assert len(lines) == 3
+    assert lines[0] == "| A | B |"
+    assert lines[2].startswith("| 1 |")
+    assert "inner" in lines[2]
@@ -0,0 +1,151 @@
+"""Checks for the plain-HTTP fetch path (no network: httpx.MockTransport)."""
+import asyncio
+
+import httpx
+import pytest
+from selectolax.lexbor import LexborHTMLParser
+
+import server
+
+PAGE = "<html><head>{meta}</head><body><p>{text}</p></body></html>"
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Route the shared HTTP client to a handler built from the test's response."""
+
+    def install(response: httpx.Response) -> None:
+        transport = httpx.MockTransport(lambda request: response)
+        monkeypatch.setattr(server, "_http_client", httpx.AsyncClient(transport=transport))
+
+    return install
+
+
+def fetch(url: str = "https://example.com/"):
+    return asyncio.run(server._fetch_static(url))
+
+
+@pytest.mark.parametrize(
+    ("meta", "encoding", "text"),
+    [
+        ('<meta charset="windows-1252">', "cp1252", "Café naïve"),
+        ("<meta charset=shift_jis>", "shift_jis", "日本語のページ"),
+        (
+            '<meta http-equiv="Content-Type" content="text/html; charset=GBK">',
+            "gbk",
+            "中文网页",
+        ),
+    ],
+)
+def test_meta_charset_is_used_without_header_charset(serve, meta, encoding, text):
+    body = PAGE.format(meta=meta, text=text).encode(encoding)
+    serve(httpx.Response(200, headers={"content-type": "text/html"}, content=body))
+    assert fetch().css_first("p").text() == text
+
+
+def test_header_charset_wins_over_meta(serve):
+    body = PAGE.format(meta='<meta charset="utf-8">', text="Café naïve").encode("cp1252")
+    headers = {"content-type": "text/html; charset=windows-1252"}
+    serve(httpx.Response(200, headers=headers, content=body))
+    assert fetch().css_first("p").text() == "Café naïve"
+
+
+def test_utf8_is_the_default(serve):
+    body = PAGE.format(meta="", text="Café naïve").encode("utf-8")
+    serve(httpx.Response(200, headers={"content-type": "text/html"}, content=body))
+    assert fetch().css_first("p").text() == "Café naïve"
+
+
+class CountingStream(httpx.AsyncByteStream):
+    """A response body that records how much of it was read."""
+
+    def __init__(self, chunk: bytes, count: int) -> None:
+        self.chunk, self.count, self.read = chunk, count, 0
+
+    async def __aiter__(self):
+        for _ in range(self.count):
+            self.read += len(self.chunk)
+            yield self.chunk
+
+
+def test_non_html_body_is_not_downloaded(serve):
+    stream = CountingStream(b"%PDF" + b"\0" * 65532, 100)
+    serve(httpx.Response(200, headers={"content-type": "application/pdf"}, stream=stream))
+    assert fetch() is None
+    assert stream.read == 0
+
+
+def test_oversized_body_stops_at_the_cap(serve):
+    chunk = b"<p>" + b"x" * 65533
+    stream = CountingStream(chunk, 200)
+    serve(httpx.Response(200, headers={"content-type": "text/html"}, stream=stream))
+    assert fetch() is None
+    assert stream.read <= server._STATIC_MAX_BYTES + len(chunk)
+
+
+def test_oversized_content_length_is_not_downloaded(serve):
+    stream = CountingStream(b"<p>x</p>", 1)
+    headers = {
+        "content-type": "text/html",
+        "content-length": str(server._STATIC_MAX_BYTES + 1),
+    }
+    serve(httpx.Response(200, headers=headers, stream=stream))
+    assert fetch() is None
+    assert stream.read == 0
+
+
+@pytest.mark.parametrize("url", ["http://[::1", "https://exa mple.com:99999/"])
+def test_invalid_url_falls_back_to_the_browser(url):
+    assert fetch(url) is None
+
+
+def needs_js(html: str) -> bool:
+    return server._needs_js(LexborHTMLParser(html))
+
+
+LONG_TEXT = "Plain paragraph text. " * 40  # well over _STATIC_MIN_TEXT
+APP_SCRIPT = '<script src="/static/app.js"></script>'
+
+
+@pytest.mark.parametrize(
+    ("html", "expected"),
+    [
+        pytest.param(
+            f"<html><head><style>{'.a{color:red}' * 100}</style>{APP_SCRIPT}</head>"
+            '<body><div id="root"></div></body></html>',
+            True,
+            id="spa-shell-with-inline-css",
+        ),
+        pytest.param(
+            f'<html><head>{APP_SCRIPT}</head><body><div id="root"></div>'
+            f"<noscript><p>{LONG_TEXT}</p></noscript></body></html>",
+            True,
+            id="spa-shell-with-noscript-fallback",
+        ),
+        pytest.param(
+            f'<html><body><div id="app"></div><script>{"var x = 1;" * 600}</script>'
+            "</body></html>",
+            True,
+            id="spa-shell-with-inline-bundle",
+        ),
+        pytest.param(
+            '<html><head><script type="application/ld+json">'
+            f'{{"@type": "Article", "text": "{"x" * 6000}"}}</script></head>'
+            "<body><h1>Short post</h1><p>Hello.</p></body></html>",
+            False,
+            id="json-ld-only",
+        ),
+        pytest.param(
+            "<html><body><h1>Title</h1><p>Hello.</p></body></html>",
+            False,
+            id="plain-static",
+        ),
+        pytest.param(
+            f"<html><head>{APP_SCRIPT}</head><body><p>{LONG_TEXT}</p></body></html>",
+            False,
+            id="long-article-with-scripts",
+        ),
+    ],
+)
+def test_needs_js(html, expected):
+    assert needs_js(html) is expected